@@ -3,12 +3,13 @@ import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
 import logging
+import log  # noqa: F401  Configures the shared pipeline log handlers on import
+from entrypoint import run_module
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+# Logging goes through the shared pipeline handlers configured in log.py
 logger = logging.getLogger(__name__)
 
 # Constants
@@ -16,40 +17,48 @@ DATASET_DIR = os.getenv("DATASET_DIR", "dataset")
 AGGREGATED_OUTPUT_DIR = os.getenv("AGGREGATED_OUTPUT_DIR", os.path.join(DATASET_DIR, "aggregated_data"))
 TRANSFORMED_PREFIX = os.getenv("TRANSFORMED_PREFIX", "transformed_data")
 AGGREGATED_PREFIX = os.getenv("AGGREGATED_PREFIX", "aggregated_data")
+AGGREGATED_COLUMNS = [
+    'symbol', 'averagedailyprice', 'totalvolume', 'dailyreturn',
+    'volatilityindex', 'movingavg5day', 'movingavg10day', 'maxdate'
+]
 
 # Ensure directories exist
 os.makedirs(DATASET_DIR, exist_ok=True)
 os.makedirs(AGGREGATED_OUTPUT_DIR, exist_ok=True)
 
-def get_latest_file(directory, prefix="transformed_data", extension=".csv"):
+def get_latest_file(directory, prefix="transformed_data", extension=".parquet"):
     """
     Get the latest file from a directory based on the modified timestamp.
     """
     try:
-        files = [f for f in os.listdir(directory) if f.startswith(prefix) and f.endswith(extension)]
-        if not files:
+        with os.scandir(directory) as entries:
+            candidates = [
+                (entry.stat().st_mtime, entry.path)
+                for entry in entries
+                if entry.name.startswith(prefix) and entry.name.endswith(extension)
+            ]
+        if not candidates:
             logger.error(f"No files with prefix '{prefix}' and extension '{extension}' found in {directory}")
             return None
 
-        latest_file = max(
-            files,
-            key=lambda x: os.path.getmtime(os.path.join(directory, x))
-        )
-        return os.path.join(directory, latest_file)
+        return max(candidates)[1]
 
     except Exception as e:
         logger.error(f"Error fetching latest file: {e}")
         return None
 
-def save_with_timestamp(df, output_directory, prefix="aggregated_data"):
+def save_with_timestamp(df, output_directory, prefix="aggregated_data", fmt="parquet"):
     """
-    Save the DataFrame to a CSV file with a timestamped filename.
+    Save the DataFrame to a Parquet (default) or CSV file with a timestamped filename.
     """
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{prefix}_{timestamp}.csv"
+        filename = f"{prefix}_{timestamp}.{fmt}"
         file_path = os.path.join(output_directory, filename)
-        df.to_csv(file_path, index=False)
+        if fmt == "parquet":
+            df.to_parquet(file_path, index=False, compression="zstd")
+        else:
+            df.to_csv(file_path, index=False)
         logger.info(f"Aggregated data saved to {file_path}")
         return file_path
 
@@ -57,6 +66,16 @@ def save_with_timestamp(df, output_directory, prefix="aggregated_data"):
         logger.error(f"Error saving aggregated file: {e}")
         return None
 
+def latest_window_mean(sorted_data, window):
+    """
+    Mean of the last `window` closes per symbol, i.e. the final value of a
+    rolling mean, or NaN when the symbol has fewer than `window` valid closes.
+    Expects rows sorted by symbol and date.
+    """
+    latest_rows = sorted_data.groupby('symbol', sort=False, observed=True).tail(window)
+    latest = latest_rows.groupby('symbol', observed=True)['closeprice']
+    return latest.mean().where(latest.count() >= window)
+
 def aggregate_data(transformed_data):
     """
     Perform aggregation on transformed stock data.
@@ -75,35 +94,29 @@ def aggregate_data(transformed_data):
         # Fill missing values
         transformed_data['dailyreturn'] = transformed_data['dailyreturn'].fillna(0)
 
-        # Find the maximum date for each symbol
-        max_date = transformed_data.groupby('symbol')['date'].max().reset_index()
-        max_date.rename(columns={'date': 'maxdate'}, inplace=True)
+        # Cache the symbol factorization and shrink the volume column for the group scans;
+        # prices and returns stay float64 so aggregate values keep full precision
+        transformed_data['symbol'] = transformed_data['symbol'].astype('category')
+        transformed_data['volume'] = pd.to_numeric(transformed_data['volume'], downcast='integer')
 
-        # Group-level calculations
-        company_performance_summary = transformed_data.groupby('symbol').agg(
+        # Group-level calculations in a single pass over the symbol groups
+        company_performance_summary = transformed_data.groupby('symbol', sort=False, observed=True).agg(
             averagedailyprice=('closeprice', 'mean'),
             totalvolume=('volume', 'sum'),
-            dailyreturn=('dailyreturn', 'mean')
+            dailyreturn=('dailyreturn', 'mean'),
+            volatilityindex=('dailyreturn', 'std'),
+            maxdate=('date', 'max')
         ).reset_index()
 
-        volatility_index = transformed_data.groupby('symbol').agg(
-            volatilityindex=('dailyreturn', 'std')
-        ).reset_index()
-
-        # Calculate moving averages
-        moving_averages = transformed_data.groupby('symbol').apply(
-            lambda group: pd.Series({
-                'movingavg5day': group['closeprice'].rolling(window=5).mean().iloc[-1]
-                if len(group) >= 5 else None,
-                'movingavg10day': group['closeprice'].rolling(window=10).mean().iloc[-1]
-                if len(group) >= 10 else None,
-            })
-        ).reset_index()
+        # Calculate moving averages from each symbol's most recent closes only
+        sorted_data = transformed_data.sort_values(['symbol', 'date'])
+        ma5 = latest_window_mean(sorted_data, 5).rename('movingavg5day')
+        ma10 = latest_window_mean(sorted_data, 10).rename('movingavg10day')
+        moving_averages = pd.concat([ma5, ma10], axis=1).rename_axis('symbol').reset_index()
 
-        # Merge results
-        aggregated_data = company_performance_summary.merge(volatility_index, on='symbol', how='left')
-        aggregated_data = aggregated_data.merge(moving_averages, on='symbol', how='left')
-        aggregated_data = aggregated_data.merge(max_date, on='symbol', how='left')
+        # Merge results, keeping the original output column order
+        aggregated_data = company_performance_summary.merge(moving_averages, on='symbol', how='left')
+        aggregated_data = aggregated_data[AGGREGATED_COLUMNS]
 
         logger.info("Data aggregation completed successfully.")
         return aggregated_data
@@ -127,7 +140,7 @@ def main():
         return
 
     try:
-        transformed_data = pd.read_csv(latest_file_path)
+        transformed_data = pd.read_parquet(latest_file_path)
 
         # Step 2: Perform aggregation
         aggregated_data = aggregate_data(transformed_data)
@@ -142,4 +155,4 @@ def main():
         logger.error(f"Error in aggregation process: {e}")
 
 if __name__ == "__main__":
-    main()
+    run_module(main)
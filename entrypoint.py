@@ -0,0 +1,18 @@
+import sys
+
+
+def run_module(standalone_main):
+    """
+    Entry point for the phase modules (extract, transform, aggregated).
+
+    Runs the full pipeline in memory via main2, or only the module's own
+    file-based phase when the script is invoked with --standalone.
+
+    Args:
+        standalone_main (callable): The module's single-phase main function.
+    """
+    if "--standalone" in sys.argv[1:]:
+        standalone_main()
+    else:
+        from main2 import main as run_pipeline
+        run_pipeline()
@@ -1,9 +1,13 @@
 import os
-import time
+import threading
 import requests
+import numpy as np
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from log import log_message
+from entrypoint import run_module
 
 # Load API key from .env file
 load_dotenv()
@@ -22,6 +26,28 @@ SYMBOLS = {
     "NFLX": "Netflix Inc."
 }
 
+# Concurrency and rate limiting (Alpha Vantage free tier: 5 requests per minute)
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", 5))
+RATE_LIMIT_CALLS = int(os.getenv("RATE_LIMIT_CALLS", 5))
+RATE_LIMIT_PERIOD = float(os.getenv("RATE_LIMIT_PERIOD", 60))
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", 10))
+
+# Shared keep-alive HTTP session so worker threads reuse TCP/TLS connections
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
+_rate_limit = threading.BoundedSemaphore(RATE_LIMIT_CALLS)
+
+def wait_for_rate_limit():
+    """
+    Block until a request slot is free. Each slot is released RATE_LIMIT_PERIOD
+    seconds after it was taken, so at most RATE_LIMIT_CALLS requests start per period.
+    """
+    _rate_limit.acquire()
+    release_timer = threading.Timer(RATE_LIMIT_PERIOD, _rate_limit.release)
+    release_timer.daemon = True
+    release_timer.start()
+
 def fetch_stock_data(symbol):
     """
     Fetch daily stock data for a specific symbol from Alpha Vantage.
@@ -43,7 +69,8 @@ def fetch_stock_data(symbol):
     }
 
     try:
-        response = requests.get(API_URL, params=params)
+        wait_for_rate_limit()
+        response = SESSION.get(API_URL, params=params, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         data = response.json()
 
@@ -52,26 +79,39 @@ def fetch_stock_data(symbol):
             log_message("error", f"Invalid data format for {symbol}: {data}")
             return None
 
-        # Parse into DataFrame
-        time_series = data["Time Series (Daily)"]
-        df = pd.DataFrame.from_dict(time_series, orient="index").reset_index()
-        
-        df.rename(columns={
-            "index": "Date",
-            "1. open": "OpenPrice",
-            "2. high": "High",
-            "3. low": "Low",
-            "4. close": "ClosePrice",
-            "5. volume": "Volume"
-        }, inplace=True)
-
-        df["Symbol"] = symbol
-        return df
+        # Parse straight into typed columns
+        df = parse_stock_data(symbol, data["Time Series (Daily)"])
+        return df if not df.empty else None
 
     except Exception as e:
         log_message("error", f"Error fetching data for {symbol}: {e}")
         return None
 
+def fetch_all_stock_data(symbols, max_workers=MAX_WORKERS):
+    """
+    Fetch daily stock data for several symbols concurrently.
+
+    Args:
+        symbols (iterable): The stock symbols.
+        max_workers (int): Number of worker threads.
+
+    Yields:
+        tuple: (symbol, pd.DataFrame or None) in completion order.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_stock_data, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def to_float(value):
+    """
+    Convert a single API field to float, returning NaN if it is missing or malformed.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
 def parse_stock_data(symbol, stock_data):
     """
     Parse the JSON data into a structured DataFrame.
@@ -84,21 +124,28 @@ def parse_stock_data(symbol, stock_data):
         pd.DataFrame: Parsed DataFrame.
     """
     try:
-        company_name = SYMBOLS[symbol]
-        records = []
-        for date, metrics in stock_data.items():
-            records.append({
-                "Symbol": symbol,
-                "CompanyName": company_name,
-                "Date": date,
-                "OpenPrice": float(metrics.get("1. open", 0)),
-                "High": float(metrics.get("2. high", 0)),
-                "Low": float(metrics.get("3. low", 0)),
-                "ClosePrice": float(metrics.get("4. close", 0)),
-                "Volume": int(metrics.get("6. volume", 0))
-            })
-
-        df = pd.DataFrame(records)
+        company_name = SYMBOLS.get(symbol)
+        rows = list(stock_data.values())
+        count = len(rows)
+
+        def column(key):
+            # Build each column as a float array in one pass, without per-row dicts
+            return np.fromiter((to_float(metrics.get(key)) for metrics in rows), dtype=np.float64, count=count)
+
+        volume = column("5. volume")
+        if np.isfinite(volume).all():
+            volume = volume.astype(np.int64)  # Keep Volume integral unless a value is missing
+
+        df = pd.DataFrame({
+            "Symbol": symbol,
+            "CompanyName": company_name,
+            "Date": np.array(list(stock_data.keys()), dtype="datetime64[D]"),
+            "OpenPrice": column("1. open"),
+            "High": column("2. high"),
+            "Low": column("3. low"),
+            "ClosePrice": column("4. close"),
+            "Volume": volume
+        })
         return df
 
     except Exception as e:
@@ -114,18 +161,13 @@ def main():
     all_data = []  # To store data for all symbols
     total_rows = 0  # Counter for total rows processed
 
-    for symbol in SYMBOLS.keys():
-        df = fetch_stock_data(symbol)
-
+    for symbol, df in fetch_all_stock_data(SYMBOLS.keys()):
         if df is not None:
             row_count = len(df)
             log_message("info", f"Extracted {row_count} rows for {symbol}")
             total_rows += row_count
             all_data.append(df)
 
-        log_message("info", "Waiting 12 seconds to respect API rate limits")
-        time.sleep(12)
-
     if all_data:
         combined_df = pd.concat(all_data, ignore_index=True)
         combined_df.drop_duplicates(subset=["Symbol", "Date"], inplace=True)
@@ -137,4 +179,4 @@ def main():
         log_message("error", "No data was fetched for any symbols")
 
 if __name__ == "__main__":
-    main()
+    run_module(main)
@@ -0,0 +1,22 @@
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def daily_return(codes, close, out):
+    """
+    Percent change of close prices within each symbol block, written into `out`.
+
+    Args:
+        codes (np.ndarray): Symbol codes, with each symbol's rows contiguous.
+        close (np.ndarray): Close prices in date order within each symbol.
+        out (np.ndarray): Output array of the same length as `close`.
+    """
+    if len(close) == 0:
+        return
+    out[0] = np.nan
+    for i in prange(1, len(close)):
+        if codes[i] == codes[i - 1]:
+            out[i] = close[i] / close[i - 1] - 1.0
+        else:
+            out[i] = np.nan
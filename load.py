@@ -1,44 +1,80 @@
+import io
 import pandas as pd
-import psycopg2
 from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
 import os
 import logging
+import log  # noqa: F401  Configures the shared pipeline log handlers on import
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Logging configuration
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Logging goes through the shared pipeline handlers configured in log.py
 
 STG_SCHEMA = "stg"
 EDW_SCHEMA = "edw"
 STG_TABLE = "stock_data"
 EDW_TABLE = "stock_data"
 
-def create_schemas_and_tables():
+# Transformed DataFrame columns -> staging table columns, in COPY order
+STG_COLUMNS = {
+    "Date": "date",
+    "OpenPrice": "open",
+    "High": "high",
+    "Low": "low",
+    "ClosePrice": "close",
+    "Volume": "volume",
+    "Symbol": "symbol"
+}
+
+_connection_pool = None
+
+def get_connection():
     """
-    Create schemas and tables for staging (stg) and enterprise data warehouse (edw).
+    Get a PostgreSQL connection from the shared pool, creating the pool on first use.
     """
-    conn = None
-    cursor = None
-    try:
-        conn = psycopg2.connect(
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = ThreadedConnectionPool(
+            1, int(os.getenv("P_pool_size", 4)),
             user=os.getenv("P_user"),
             password=os.getenv("P_password"),
             host=os.getenv("P_host"),
             port=os.getenv("P_port"),
             dbname=os.getenv("P_database")
         )
+    return _connection_pool.getconn()
+
+def release_connection(conn):
+    """
+    Return a connection obtained from get_connection() to the pool.
+    """
+    _connection_pool.putconn(conn)
+
+def create_schemas_and_tables(conn=None):
+    """
+    Create schemas and tables for staging (stg) and enterprise data warehouse (edw).
+
+    Args:
+        conn: Open connection to use; one is taken from the pool if not given.
+    """
+    owns_conn = conn is None
+    cursor = None
+    try:
+        if owns_conn:
+            conn = get_connection()
         cursor = conn.cursor()
 
         # Create schemas
         cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {STG_SCHEMA};")
         cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {EDW_SCHEMA};")
 
-        # Create tables with unique constraints
+        # Staging is truncated on every load, so skip WAL and the (symbol, date) unique
+        # index there; duplicates are resolved when moving to EDW. The RecordID primary
+        # key is kept to break DISTINCT ON ties in COPY input order.
         cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {STG_SCHEMA}.{STG_TABLE} (
+            CREATE UNLOGGED TABLE IF NOT EXISTS {STG_SCHEMA}.{STG_TABLE} (
                 RecordID SERIAL PRIMARY KEY,
                 date DATE NOT NULL,
                 open FLOAT NOT NULL CHECK (open >= 0),
@@ -47,10 +83,11 @@ def create_schemas_and_tables():
                 close FLOAT NOT NULL CHECK (close >= 0),
                 volume BIGINT NOT NULL CHECK (volume >= 0),
                 symbol VARCHAR(10) NOT NULL,
-                UNIQUE (symbol, date)
+                loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
             );
         """)
 
+        # Create EDW table with unique constraints
         cursor.execute(f"""
             CREATE TABLE IF NOT EXISTS {EDW_SCHEMA}.{EDW_TABLE} (
                 RecordID SERIAL PRIMARY KEY,
@@ -61,99 +98,161 @@ def create_schemas_and_tables():
                 close FLOAT NOT NULL CHECK (close >= 0),
                 volume BIGINT NOT NULL CHECK (volume >= 0),
                 symbol VARCHAR(10) NOT NULL,
+                loaded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
                 UNIQUE (symbol, date)
             );
         """)
 
+        # Add the load timestamp column to tables created before it existed; it is
+        # time-zone aware so values do not depend on the session's TimeZone
+        for schema, table in ((STG_SCHEMA, STG_TABLE), (EDW_SCHEMA, EDW_TABLE)):
+            cursor.execute(f"""
+                ALTER TABLE {schema}.{table}
+                ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMPTZ NOT NULL DEFAULT now();
+            """)
+            cursor.execute(f"ALTER TABLE {schema}.{table} ALTER COLUMN loaded_at TYPE TIMESTAMPTZ;")
+        cursor.execute(f"DROP INDEX IF EXISTS {STG_SCHEMA}.{STG_TABLE}_loaded_at_idx;")
+
+        # Bring a staging table created by earlier versions in line with the DDL above
+        cursor.execute(f"ALTER TABLE {STG_SCHEMA}.{STG_TABLE} DROP CONSTRAINT IF EXISTS {STG_TABLE}_symbol_date_key;")
+        cursor.execute(f"ALTER TABLE {STG_SCHEMA}.{STG_TABLE} SET UNLOGGED;")
+
         conn.commit()
         logging.info("Schemas and tables created successfully with required constraints.")
 
     except Exception as e:
         logging.error(f"Error creating schemas or tables: {e}")
+        if conn:
+            conn.rollback()
 
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
+        if owns_conn and conn:
+            release_connection(conn)
 
-def load_data_into_staging(data, table_name, engine):
+def load_data_into_staging(data, table_name, conn):
     """
-    Load data into the specified staging table.
+    Bulk load data into the specified staging table using COPY FROM STDIN.
     """
     try:
-        data.to_sql(table_name, con=engine, schema="stg", if_exists='append', index=False)
+        buffer = io.StringIO()
+        data[list(STG_COLUMNS)].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+
+        copy_query = sql.SQL("COPY {}.{} ({}) FROM STDIN WITH CSV").format(
+            sql.Identifier(STG_SCHEMA),
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(map(sql.Identifier, STG_COLUMNS.values()))
+        )
+        with conn.cursor() as cursor:
+            # Staging only holds the current load
+            cursor.execute(sql.SQL("TRUNCATE {}.{}").format(sql.Identifier(STG_SCHEMA), sql.Identifier(table_name)))
+            cursor.copy_expert(copy_query, buffer)
         logging.info(f"{len(data)} rows loaded into staging table: {table_name}.")
     except Exception as e:
         logging.error(f"Error loading data into staging table {table_name}: {e}")
         raise
 
-def load_data_to_postgres(input_file="dataset\transformed_data_20241219_110050.csv"):
+def read_transformed_file(input_file):
+    """
+    Read a saved transformed data file, as Parquet or CSV depending on its extension.
+    """
+    if input_file.endswith(".parquet"):
+        return pd.read_parquet(input_file)
+    return pd.read_csv(input_file)
+
+def load_data_to_postgres(data, conn=None):
     """
     Loads the transformed data into the PostgreSQL staging table.
 
     Args:
-        input_file (str): Path to the transformed data file.
+        data (pd.DataFrame or str): Transformed DataFrame, or path to a saved
+            transformed data file (.parquet or .csv).
+        conn: Open connection to use; one is taken from the pool if not given.
     """
     logging.info("Starting data load process.")
 
-    if not os.path.exists(input_file) or os.path.getsize(input_file) == 0:
-        logging.error("Transformed data file is missing or empty.")
-        raise FileNotFoundError("No data available for loading.")
+    if isinstance(data, str):
+        if not os.path.exists(data) or os.path.getsize(data) == 0:
+            logging.error("Transformed data file is missing or empty.")
+            raise FileNotFoundError("No data available for loading.")
+        data = read_transformed_file(data)
 
-    conn = None
-    cursor = None
+    if data.empty:
+        logging.error("Transformed data is empty.")
+        raise ValueError("No data available for loading.")
 
+    owns_conn = conn is None
+    try:
+        if owns_conn:
+            conn = get_connection()
+        load_data_into_staging(data, STG_TABLE, conn)
+        conn.commit()
 
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
 
-def move_data_to_edw():
+    finally:
+        if owns_conn and conn:
+            release_connection(conn)
+
+def move_data_to_edw(conn=None):
     """
     Move data from the staging (stg) table to the enterprise data warehouse (edw) table.
+
+    Args:
+        conn: Open connection to use; one is taken from the pool if not given.
     """
-    conn = None
+    owns_conn = conn is None
     cursor = None
     try:
-        conn = psycopg2.connect(
-            user=os.getenv("P_user"),
-            password=os.getenv("P_password"),
-            host=os.getenv("P_host"),
-            port=os.getenv("P_port"),
-            dbname=os.getenv("P_database")
-        )
+        if owns_conn:
+            conn = get_connection()
         cursor = conn.cursor()
 
-        # Move data from staging to EDW
+        # Move data from staging to EDW; staging only holds the current load
         cursor.execute(f"""
-            INSERT INTO {EDW_SCHEMA}.{EDW_TABLE} (date, open, high, low, close, volume, symbol)
-            SELECT date, open, high, low, close, volume, symbol
+            INSERT INTO {EDW_SCHEMA}.{EDW_TABLE} (date, open, high, low, close, volume, symbol, loaded_at)
+            SELECT DISTINCT ON (symbol, date) date, open, high, low, close, volume, symbol, loaded_at
             FROM {STG_SCHEMA}.{STG_TABLE}
+            ORDER BY symbol, date, loaded_at DESC, RecordID DESC
             ON CONFLICT (symbol, date) DO UPDATE
             SET
                 open = EXCLUDED.open,
                 high = EXCLUDED.high,
                 low = EXCLUDED.low,
                 close = EXCLUDED.close,
-                volume = EXCLUDED.volume;
+                volume = EXCLUDED.volume,
+                loaded_at = EXCLUDED.loaded_at;
         """)
         conn.commit()
-        logging.info("Data moved to EDW table successfully.")
+        logging.info(f"{cursor.rowcount} rows moved to EDW table successfully.")
 
     except Exception as e:
         logging.error(f"Error moving data to EDW: {e}")
+        if conn:
+            conn.rollback()
 
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
+        if owns_conn and conn:
+            release_connection(conn)
 
 if __name__ == "__main__":
-    # Create schemas and tables
-    create_schemas_and_tables()
+    conn = get_connection()
+    try:
+        # Create schemas and tables
+        create_schemas_and_tables(conn)
 
-    # Load data into staging table
-    load_data_to_postgres(r"dataset\transformed_data_20241219_110050.csv")
+        # Load data into staging table
+        load_data_to_postgres(r"dataset\transformed_data_20241219_110050.csv", conn)
 
-    # Move data to EDW table
-    move_data_to_edw()
+        # Move data to EDW table
+        move_data_to_edw(conn)
+    finally:
+        release_connection(conn)
 
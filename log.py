@@ -1,16 +1,37 @@
 
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 
+# Handlers run on a background listener thread; callers only enqueue records
+log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s\n\n")
+file_handler = logging.FileHandler("pipeline_exec.log")  # Log to a file
+file_handler.setFormatter(log_formatter)
+stream_handler = logging.StreamHandler()  # Log to the console
+stream_handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, file_handler, stream_handler)
+log_listener.start()
+atexit.register(log_listener.stop)  # Flush queued records on exit
+
+# The queue only carries the message text; the listener's handlers add timestamp and level
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s\n\n",
-    handlers=[
-        logging.FileHandler("pipeline_exec.log"),  # Log to a file
-        logging.StreamHandler()  # Log to the console
-    ]
+    handlers=[queue_handler]
 )
 
+# Level name -> bound root logger method, resolved once at import
+_LOG_FUNCS = {
+    name: getattr(logging.getLogger(), name)
+    for name in ("debug", "info", "warning", "error", "critical")
+}
+
 def log_message(level, message):
     """
     Log a message at the specified level.
@@ -19,6 +40,10 @@ def log_message(level, message):
         level (str): Log level ('info', 'error', 'warning', etc.).
         message (str): Message to log.
     """
-    log_func = getattr(logging, level.lower(), None)
-    if callable(log_func):
-        log_func(message)
\ No newline at end of file
+    try:
+        log_func = _LOG_FUNCS[level]
+    except KeyError:
+        log_func = _LOG_FUNCS.get(level.lower())
+        if log_func is None:
+            return
+    log_func(message)
@@ -1,8 +1,11 @@
 import os
 import pandas as pd
-from extract import fetch_stock_data, SYMBOLS  # Import fetch function and symbols
+from extract import fetch_all_stock_data, SYMBOLS  # Import fetch function and symbols
 from transform import transform_data
-from load import create_schemas_and_tables, load_data_to_postgres, move_data_to_edw
+from load import (
+    create_schemas_and_tables, load_data_to_postgres, move_data_to_edw,
+    get_connection, release_connection
+)
 from aggregated import aggregate_data, save_with_timestamp
 from log import log_message
 from datetime import datetime
@@ -20,6 +23,21 @@ def ensure_directory_exists(directory):
         log_message("info", f"Directory '{directory}' created.")
 
 
+def open_db_connection():
+    """
+    Borrow a pooled database connection for the database steps.
+
+    Returns:
+        Connection, or None if the database is unreachable; the file-based
+        phases of the pipeline still run in that case.
+    """
+    try:
+        return get_connection()
+    except Exception as e:
+        log_message("error", f"Could not connect to the database: {e}")
+        return None
+
+
 def extract_data():
     """
     Extract data for multiple stock symbols.
@@ -32,10 +50,8 @@ def extract_data():
     all_data = []  # List to collect data for all symbols
     total_rows = 0  # Total rows extracted
 
-    for symbol in SYMBOLS:
-        # Fetch data for the symbol
-        df = fetch_stock_data(symbol)
-
+    # Fetch data for all symbols concurrently
+    for symbol, df in fetch_all_stock_data(SYMBOLS):
         if df is not None:
             # Log and append the data
             row_count = len(df)
@@ -61,7 +77,12 @@ def main():
 
     # Step 1: Schema Setup
     log_message("info", "Creating schemas and tables")
-    create_schemas_and_tables()
+    conn = open_db_connection()
+    if conn:
+        try:
+            create_schemas_and_tables(conn)
+        finally:
+            release_connection(conn)
 
     # Ensure the dataset directory exists
     dataset = "dataset"
@@ -72,8 +93,8 @@ def main():
     extracted_data = extract_data()
 
     if not extracted_data.empty:
-        # Save extracted data
-        extracted_file = save_with_timestamp(extracted_data, dataset, "extracted_stock_data")
+        # Save extracted data as the raw CSV archive
+        extracted_file = save_with_timestamp(extracted_data, dataset, "extracted_stock_data", fmt="csv")
 
         # Step 3: Transform
         log_message("info", "Starting transformation phase")
@@ -81,15 +102,23 @@ def main():
 
         if not transformed_data.empty:
             # Save transformed data
-            transformed_file = save_with_timestamp(transformed_data, dataset, "transformed_data")
-
-            # Step 4: Load
-            log_message("info", "Starting load phase")
-            load_data_to_postgres(transformed_file)
-
-            # Step 5: Move to EDW
-            log_message("info", "Moving data to EDW")
-            move_data_to_edw()
+            save_with_timestamp(transformed_data, dataset, "transformed_data")
+
+            # Steps 4 and 5 share one database connection
+            conn = open_db_connection()
+            if conn:
+                try:
+                    # Step 4: Load
+                    log_message("info", "Starting load phase")
+                    load_data_to_postgres(transformed_data, conn)
+
+                    # Step 5: Move to EDW
+                    log_message("info", "Moving data to EDW")
+                    move_data_to_edw(conn)
+                except Exception as e:
+                    log_message("error", f"Load failed, skipping move to EDW: {e}")
+                finally:
+                    release_connection(conn)
 
             # Step 6: Aggregate
             log_message("info", "Starting aggregation phase")
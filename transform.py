@@ -1,8 +1,15 @@
 import os
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
 from log import log_message
+from entrypoint import run_module
+
+try:
+    from kernels import daily_return as daily_return_kernel
+except ImportError:  # numba not installed; fall back to the numpy implementation
+    daily_return_kernel = None
 
 # Load environment variables
 load_dotenv()
@@ -10,7 +17,18 @@ load_dotenv()
 # Directory containing the dataset
 DATASET_DIR = "dataset"
 INPUT_FILE_NAME = "extracted_stock_data.csv"  # Replace with the name of your raw dataset file
-OUTPUT_FILE_NAME = "transformed_data.csv"
+OUTPUT_FILE_NAME = "transformed_data.parquet"
+
+# Column types of the raw dataset, so CSV reads skip dtype inference
+NUMERIC_DTYPES = {
+    "OpenPrice": "float64",
+    "High": "float64",
+    "Low": "float64",
+    "ClosePrice": "float64",
+    "Volume": "int64"
+}
+# Volume is read as float so a blank cell becomes NaN; transform_data narrows it to int64
+RAW_DTYPES = {**NUMERIC_DTYPES, "Volume": "float64", "Symbol": "string"}
 
 def load_existing_data(file_name):
     """
@@ -29,13 +47,44 @@ def load_existing_data(file_name):
         return None
 
     try:
-        df = pd.read_csv(file_path)
+        df = pd.read_csv(file_path, engine="pyarrow", dtype=RAW_DTYPES, parse_dates=["Date"])
         log_message("info", f"Loaded data from {file_path}")
         return df
     except Exception as e:
         log_message("error", f"Error loading data from {file_path}: {e}")
         return None
 
+def daily_returns(codes, close):
+    """
+    Percent change of close prices within each symbol block.
+
+    Args:
+        codes (np.ndarray): Symbol codes, with each symbol's rows contiguous.
+        close (np.ndarray): Close prices in date order within each symbol.
+
+    Returns:
+        np.ndarray: Daily returns, NaN on the first row of each symbol.
+    """
+    if daily_return_kernel is not None:
+        returns = np.empty_like(close)
+        daily_return_kernel(codes, close, returns)
+        return returns
+
+    if len(close) == 0:
+        return np.empty(0, dtype=np.float64)
+
+    prev = np.empty_like(close)
+    prev[0] = np.nan
+    prev[1:] = close[:-1]
+
+    boundary = np.empty(len(close), dtype=bool)
+    boundary[0] = True
+    boundary[1:] = codes[1:] != codes[:-1]
+
+    returns = close / prev - 1.0
+    returns[boundary] = np.nan
+    return returns
+
 def transform_data(df):
     """
     Transform the stock data to a standardized format.
@@ -54,19 +103,20 @@ def transform_data(df):
             return pd.DataFrame()
 
         # Standardize column data types
-        df["Date"] = pd.to_datetime(df["Date"]).dt.strftime("%Y-%m-%d")  # Standardize date format
-        df["OpenPrice"] = pd.to_numeric(df["OpenPrice"], errors="coerce")
-        df["High"] = pd.to_numeric(df["High"], errors="coerce")
-        df["Low"] = pd.to_numeric(df["Low"], errors="coerce")
-        df["ClosePrice"] = pd.to_numeric(df["ClosePrice"], errors="coerce")
-        df["Volume"] = pd.to_numeric(df["Volume"], errors="coerce", downcast="integer")
-        df["Symbol"] = df["Symbol"].str.upper()  # Ensure symbols are uppercase
+        df["Date"] = pd.to_datetime(df["Date"])  # Kept as datetime64; written as YYYY-MM-DD on save
+        # Coerce unparseable text to NaN, as before; columns left with NaN stay float
+        text_columns = [col for col in NUMERIC_DTYPES if not pd.api.types.is_numeric_dtype(df[col])]
+        if text_columns:
+            df[text_columns] = df[text_columns].apply(pd.to_numeric, errors="coerce")
+        df = df.astype({col: dtype for col, dtype in NUMERIC_DTYPES.items() if not df[col].hasnans})
+        df["Symbol"] = df["Symbol"].str.upper().astype("category")  # Uppercase symbols, cached as codes
 
-        # Sort by date for consistency
-        df.sort_values(by=["Date"], ascending=True, inplace=True)
+        # Sort by symbol, then date, so each symbol's rows are contiguous and in date order
+        df.sort_values(by=["Symbol", "Date"], ascending=True, inplace=True)
 
         # Calculate DailyReturn
-        df["DailyReturn"] = df.groupby("Symbol")["ClosePrice"].pct_change()
+        codes, _ = pd.factorize(df["Symbol"])
+        df["DailyReturn"] = daily_returns(codes, df["ClosePrice"].to_numpy(dtype=np.float64))
 
         log_message("info", "Data transformed to standard format, including DailyReturn")
         return df
@@ -80,7 +130,7 @@ def save_to_directory(df, file_name):
 
     Args:
         df (pd.DataFrame): The DataFrame to save.
-        file_name (str): The name of the file to save.
+        file_name (str): The name of the file to save; ".parquet" names are written as Parquet, others as CSV.
     """
     try:
         # Ensure the directory exists
@@ -88,7 +138,10 @@ def save_to_directory(df, file_name):
 
         # Save file to the dataset directory
         file_path = os.path.join(DATASET_DIR, file_name)
-        df.to_csv(file_path, index=False)
+        if file_name.endswith(".parquet"):
+            df.to_parquet(file_path, index=False, compression="zstd")
+        else:
+            df.to_csv(file_path, index=False)
 
         log_message("info", f"File saved to {file_path}")
         print(f"File saved to {file_path}")
@@ -117,4 +170,4 @@ def main():
         log_message("error", "No raw data available for transformation.")
 
 if __name__ == "__main__":
-    main()
+    run_module(main)